@@ -14,9 +14,21 @@ from tempfile import NamedTemporaryFile
 import asyncio
 import edge_tts
 import serial
+from session_trace import SessionTrace
+
+# ---------------- Session Trace (Record / Replay) ----------------
+# Opt-in. PHOENIX_TRACE_RECORD=session.zip captures every input of a live session
+# (audio segments, serial lines, STT transcripts and timestamps) into a trace archive.
+# PHOENIX_TRACE_REPLAY=session.zip feeds that trace back at full speed without
+# microphone, Deneyap board, TTS or network access.
+TRACE_RECORD_PATH = os.environ.get("PHOENIX_TRACE_RECORD")
+TRACE_REPLAY_PATH = os.environ.get("PHOENIX_TRACE_REPLAY")
+
+session_trace = SessionTrace(TRACE_RECORD_PATH, TRACE_REPLAY_PATH)
 
 # ---------------- Global Settings ----------------
-pygame.mixer.init()  # Using "en-US-GuyNeural" voice
+if not session_trace.replaying:
+    pygame.mixer.init()  # Using "en-US-GuyNeural" voice
 
 def remove_file_with_retry(file_path, retries=10, delay=0.1):
     for _ in range(retries):
@@ -28,6 +40,9 @@ def remove_file_with_retry(file_path, retries=10, delay=0.1):
     print(f"File {file_path} could not be removed.")
 
 def tts_speak(text):
+    if session_trace.replaying:
+        print("[TTS]", text)
+        return
     async def speak_text():
         communicate = edge_tts.Communicate(text, voice="en-US-GuyNeural", rate="+0%")
         with NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
@@ -47,8 +62,8 @@ def tts_speak(text):
 # ---------------- Global Variables ----------------
 lock_open = False
 active_user = None
-note_file = Path("notes.txt")
-REFERENCE_FOLDER = "references"
+note_file = session_trace.local_path("notes.txt")
+REFERENCE_FOLDER = session_trace.snapshot_folder("references")
 
 if not Path(REFERENCE_FOLDER).exists():
     Path(REFERENCE_FOLDER).mkdir(parents=True)
@@ -70,14 +85,14 @@ def register_reference_user():
     recognizer = sr.Recognizer()
     registered = None
     while registered is None:
-        with sr.Microphone() as source:
+        with session_trace.microphone() as source:
             tts_speak("No reference voice found. Please say your name:")
-            audio = recognizer.listen(source, timeout=10, phrase_time_limit=10)
-        temp_file = "temp_reference.wav"
+            audio = session_trace.capture("listen", recognizer.listen, source, timeout=10, phrase_time_limit=10)
+        temp_file = session_trace.local_path("temp_reference.wav")
         with open(temp_file, "wb") as f:
             f.write(audio.get_wav_data())
         try:
-            name = recognizer.recognize_google(audio, language="en-US").lower().strip()
+            name = session_trace.capture("stt", recognizer.recognize_google, audio, language="en-US").lower().strip()
             if not name:
                 tts_speak("Name not detected, please try again.")
                 continue
@@ -120,14 +135,18 @@ AUTHORIZED_CODES = {
     "98765": "john",  # If the Arduino sends "98765", user "john" is accepted.
 }
 
+def read_deneyap_code(ser):
+    raw_data = ser.readline()
+    ser.close()
+    return raw_data.decode("utf-8", errors="replace").strip()
+
 def authenticate_via_deneyap(port_name="COM15"):
     try:
-        ser = serial.Serial(port_name, baudrate=9600, timeout=5)
+        ser = session_trace.capture("serial_open", serial.Serial, port_name, baudrate=9600, timeout=5)
         tts_speak("Deneyap board detected, performing verification...")
-        time.sleep(2)
-        raw_data = ser.readline()
-        received_code = raw_data.decode("utf-8", errors="replace").strip()
-        ser.close()
+        if not session_trace.replaying:
+            time.sleep(2)
+        received_code = session_trace.capture("serial", read_deneyap_code, ser)
         print("Received card code:", received_code)
         if received_code in AUTHORIZED_CODES:
             global active_user
@@ -143,14 +162,14 @@ def authenticate_via_deneyap(port_name="COM15"):
 
 def voice_verification_factor():
     recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
+    with session_trace.microphone() as source:
         tts_speak("Please repeat your username for voice verification:")
         try:
-            audio = recognizer.listen(source, timeout=10, phrase_time_limit=10)
+            audio = session_trace.capture("listen", recognizer.listen, source, timeout=10, phrase_time_limit=10)
         except sr.WaitTimeoutError:
             tts_speak("Voice input not detected, please try again.")
             return False
-    temp_voice_file = "temp_voice.wav"
+    temp_voice_file = session_trace.local_path("temp_voice.wav")
     with open(temp_voice_file, "wb") as f:
         f.write(audio.get_wav_data())
     ref_file = authorized_users.get(active_user)
@@ -177,15 +196,15 @@ def add_new_user():
     global authorized_users, active_user
     recognizer = sr.Recognizer()
     tts_speak("Entering new user registration mode.")
-    with sr.Microphone() as source:
+    with session_trace.microphone() as source:
         tts_speak("Please say the new user's name:")
         try:
-            audio_name = recognizer.listen(source, timeout=10, phrase_time_limit=10)
+            audio_name = session_trace.capture("listen", recognizer.listen, source, timeout=10, phrase_time_limit=10)
         except sr.WaitTimeoutError:
             tts_speak("No voice detected for registration.")
             return
     try:
-        new_name = recognizer.recognize_google(audio_name, language="en-US").lower().strip()
+        new_name = session_trace.capture("stt", recognizer.recognize_google, audio_name, language="en-US").lower().strip()
         tts_speak(f"New user name: {new_name}.")
     except Exception:
         tts_speak("Could not capture the new user's name, please try again.")
@@ -193,14 +212,14 @@ def add_new_user():
     if new_name in authorized_users:
         tts_speak("This user is already registered!")
         return
-    with sr.Microphone() as source:
+    with session_trace.microphone() as source:
         tts_speak(f"Recording reference voice for {new_name}. Please repeat your name:")
         try:
-            audio = recognizer.listen(source, timeout=10, phrase_time_limit=10)
+            audio = session_trace.capture("listen", recognizer.listen, source, timeout=10, phrase_time_limit=10)
         except sr.WaitTimeoutError:
             tts_speak("Reference voice not detected.")
             return
-    temp_file = "temp_reference.wav"
+    temp_file = session_trace.local_path("temp_reference.wav")
     with open(temp_file, "wb") as f:
         f.write(audio.get_wav_data())
     new_file = Path(REFERENCE_FOLDER) / f"reference_{new_name}.wav"
@@ -229,14 +248,14 @@ def take_note():
     tts_speak("Note taking started. Say your note. Say 'done' when finished.")
     recognizer = sr.Recognizer()
     while True:
-        with sr.Microphone() as source:
+        with session_trace.microphone() as source:
             try:
-                audio = recognizer.listen(source, timeout=10, phrase_time_limit=10)
+                audio = session_trace.capture("listen", recognizer.listen, source, timeout=10, phrase_time_limit=10)
             except sr.WaitTimeoutError:
                 tts_speak("No voice detected, please try again.")
                 continue
         try:
-            note_text = recognizer.recognize_google(audio, language="en-US").strip()
+            note_text = session_trace.capture("stt", recognizer.recognize_google, audio, language="en-US").strip()
             print("Captured note:", note_text)
             if note_text.lower() in ["done", "finished", "stop"]:
                 break
@@ -259,14 +278,14 @@ def voice_command():
     global lock_open, active_user, authorized_users
     recognizer = sr.Recognizer()
     try:
-        with sr.Microphone() as source:
+        with session_trace.microphone() as source:
             tts_speak("Waiting for your command...")
-            audio = recognizer.listen(source, timeout=10, phrase_time_limit=10)
+            audio = session_trace.capture("listen", recognizer.listen, source, timeout=10, phrase_time_limit=10)
     except sr.WaitTimeoutError:
         tts_speak("No command detected, please try again.")
         return False
     try:
-        command = recognizer.recognize_google(audio, language="en-US").lower().strip()
+        command = session_trace.capture("stt", recognizer.recognize_google, audio, language="en-US").lower().strip()
         print(f"Captured command: {command}")
     except sr.UnknownValueError:
         tts_speak("I did not catch that, please repeat.")
@@ -278,7 +297,8 @@ def voice_command():
     if lock_open and active_user is not None:
         if command == "shut down":
             tts_speak("Shutting down the system.")
-            time.sleep(2)
+            if not session_trace.replaying:
+                time.sleep(2)
             sys.exit()
         elif command == "how are you":
             tts_speak("I'm fine. I hope you are too!")
@@ -300,7 +320,8 @@ def voice_command():
             query = command.replace("search", "").strip()
             if query:
                 tts_speak(f"Searching Google for {query}.")
-                webbrowser.open(f"https://www.google.com/search?q={query.replace(' ', '+')}")
+                if not session_trace.replaying:
+                    webbrowser.open(f"https://www.google.com/search?q={query.replace(' ', '+')}")
                 return True
             else:
                 tts_speak("No search query detected.")
@@ -322,10 +343,10 @@ def voice_command():
 tts_speak("Lock system activated. Please complete the authentication steps.")
 
 while not lock_open:
-    if two_step_authentication():
+    if session_trace.timed("two_step_authentication", two_step_authentication):
         break
     else:
         tts_speak("Authentication failed. Please try again.")
 
 while True:
-    voice_command()
+    session_trace.timed("voice_command", voice_command)
@@ -14,9 +14,31 @@ from tempfile import NamedTemporaryFile
 import asyncio
 import edge_tts
 import serial
+from session_trace import SessionTrace
+
+# ---------------- Oturum İzi (Kayıt / Tekrar Oynatma) ----------------
+# İsteğe bağlı. PHOENIX_TRACE_RECORD=oturum.zip canlı oturumun tüm girdilerini
+# (ses parçaları, seri satırlar, STT metinleri ve zaman damgaları) bir iz arşivine kaydeder.
+# PHOENIX_TRACE_REPLAY=oturum.zip bu izi mikrofon, Deneyap kartı, TTS veya ağ
+# erişimi olmadan tam hızda yeniden oynatır.
+TRACE_RECORD_PATH = os.environ.get("PHOENIX_TRACE_RECORD")
+TRACE_REPLAY_PATH = os.environ.get("PHOENIX_TRACE_REPLAY")
+
+TRACE_MESSAGES = {
+    "both_set": "PHOENIX_TRACE_RECORD ve PHOENIX_TRACE_REPLAY aynı anda kullanılamaz.",
+    "recording": "Oturum izi kaydediliyor: {path}.",
+    "replaying": "Oturum izi oynatılıyor: {path} ({count} olay).",
+    "saved": "Oturum izi kaydedildi: {path} ({count} olay).",
+    "exhausted": "Tekrar oynatma bitti: iz tükendi.",
+    "diverged": "Tekrar oynatma {position}. olayda ayrıştı: beklenen {expected}, bulunan {found}.",
+    "timing": "{label}: {count} çağrı, toplam {total:.3f}s, ortalama {mean:.3f}s, en fazla {max:.3f}s",
+}
+
+session_trace = SessionTrace(TRACE_RECORD_PATH, TRACE_REPLAY_PATH, messages=TRACE_MESSAGES)
 
 # ---------------- Global Ayarlar ----------------
-pygame.mixer.init()  # "tr-TR-AhmetNeural" sesi kullanılacak
+if not session_trace.replaying:
+    pygame.mixer.init()  # "tr-TR-AhmetNeural" sesi kullanılacak
 
 def remove_file_with_retry(file_path, retries=10, delay=0.1):
     for _ in range(retries):
@@ -28,6 +50,9 @@ def remove_file_with_retry(file_path, retries=10, delay=0.1):
     print(f"Dosya {file_path} silinemedi.")
 
 def tts_speak(text):
+    if session_trace.replaying:
+        print("[TTS]", text)
+        return
     async def speak_text():
         communicate = edge_tts.Communicate(text, voice="tr-TR-AhmetNeural", rate="+0%")
         with NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
@@ -47,8 +72,8 @@ def tts_speak(text):
 # ---------------- Sistem Genel Değişkenleri ----------------
 lock_open = False
 active_user = None
-note_file = Path("notlar.txt")
-REFERENCE_KLASORU = "referanslar"
+note_file = session_trace.local_path("notlar.txt")
+REFERENCE_KLASORU = session_trace.snapshot_folder("referanslar")
 
 if not Path(REFERENCE_KLASORU).exists():
     Path(REFERENCE_KLASORU).mkdir(parents=True)
@@ -70,14 +95,14 @@ def register_reference_user():
     recognizer = sr.Recognizer()
     registered = None
     while registered is None:
-        with sr.Microphone() as source:
+        with session_trace.microphone() as source:
             tts_speak("Referans ses bulunamadı. Lütfen isminizi söyleyin:")
-            audio = recognizer.listen(source, timeout=10, phrase_time_limit=10)
-        temp_file = "temp_reference.wav"
+            audio = session_trace.capture("listen", recognizer.listen, source, timeout=10, phrase_time_limit=10)
+        temp_file = session_trace.local_path("temp_reference.wav")
         with open(temp_file, "wb") as f:
             f.write(audio.get_wav_data())
         try:
-            name = recognizer.recognize_google(audio, language="tr-TR").lower().strip()
+            name = session_trace.capture("stt", recognizer.recognize_google, audio, language="tr-TR").lower().strip()
             if not name:
                 tts_speak("İsim algılanamadı, lütfen tekrar deneyin.")
                 continue
@@ -120,14 +145,18 @@ AUTHORIZED_CODES = {
     "98765": "yusuf",  # Kart 98765 gönderdiğinde kullanıcı 'yusuf'
 }
 
+def read_deneyap_code(ser):
+    raw_data = ser.readline()
+    ser.close()
+    return raw_data.decode("utf-8", errors="replace").strip()
+
 def authenticate_via_deneyap(port_name="COM15"):
     try:
-        ser = serial.Serial(port_name, baudrate=9600, timeout=5)
+        ser = session_trace.capture("serial_open", serial.Serial, port_name, baudrate=9600, timeout=5)
         tts_speak("Deneyap kartı algılandı, doğrulama yapılıyor...")
-        time.sleep(2)
-        raw_data = ser.readline()
-        received_code = raw_data.decode("utf-8", errors="replace").strip()
-        ser.close()
+        if not session_trace.replaying:
+            time.sleep(2)
+        received_code = session_trace.capture("serial", read_deneyap_code, ser)
         print("Alınan kart kodu:", received_code)
         if received_code in AUTHORIZED_CODES:
             global active_user
@@ -143,14 +172,14 @@ def authenticate_via_deneyap(port_name="COM15"):
 
 def voice_verification_factor():
     recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
+    with session_trace.microphone() as source:
         tts_speak("Lütfen kullanıcı adınızı sesle tekrar edin:")
         try:
-            audio = recognizer.listen(source, timeout=10, phrase_time_limit=10)
+            audio = session_trace.capture("listen", recognizer.listen, source, timeout=10, phrase_time_limit=10)
         except sr.WaitTimeoutError:
             tts_speak("Ses alınamadı, tekrar deneyin.")
             return False
-    temp_voice_file = "temp_voice.wav"
+    temp_voice_file = session_trace.local_path("temp_voice.wav")
     with open(temp_voice_file, "wb") as f:
         f.write(audio.get_wav_data())
     ref_file = authorized_users.get(active_user)
@@ -177,15 +206,15 @@ def add_new_user():
     global authorized_users, active_user
     recognizer = sr.Recognizer()
     tts_speak("Yeni kullanıcı kaydı moduna giriliyor.")
-    with sr.Microphone() as source:
+    with session_trace.microphone() as source:
         tts_speak("Lütfen yeni kullanıcının adını söyleyin:")
         try:
-            audio_name = recognizer.listen(source, timeout=10, phrase_time_limit=10)
+            audio_name = session_trace.capture("listen", recognizer.listen, source, timeout=10, phrase_time_limit=10)
         except sr.WaitTimeoutError:
             tts_speak("Kayıt için ses alınamadı.")
             return
     try:
-        new_name = recognizer.recognize_google(audio_name, language="tr-TR").lower().strip()
+        new_name = session_trace.capture("stt", recognizer.recognize_google, audio_name, language="tr-TR").lower().strip()
         tts_speak(f"Yeni kullanıcı adı: {new_name}.")
     except Exception:
         tts_speak("Yeni kullanıcının adı yakalanamadı, lütfen tekrar deneyin.")
@@ -193,14 +222,14 @@ def add_new_user():
     if new_name in authorized_users:
         tts_speak("Bu kullanıcı zaten kayıtlı!")
         return
-    with sr.Microphone() as source:
+    with session_trace.microphone() as source:
         tts_speak(f"{new_name} için referans sesi kaydediliyor. Lütfen adınızı tekrar edin:")
         try:
-            audio = recognizer.listen(source, timeout=10, phrase_time_limit=10)
+            audio = session_trace.capture("listen", recognizer.listen, source, timeout=10, phrase_time_limit=10)
         except sr.WaitTimeoutError:
             tts_speak("Referans sesi alınamadı.")
             return
-    temp_file = "temp_reference.wav"
+    temp_file = session_trace.local_path("temp_reference.wav")
     with open(temp_file, "wb") as f:
         f.write(audio.get_wav_data())
     new_file = Path(REFERENCE_KLASORU) / f"referans_{new_name}.wav"
@@ -230,13 +259,13 @@ def take_note():
     recognizer = sr.Recognizer()
     full_note = ""
     while True:
-        with sr.Microphone() as source:
+        with session_trace.microphone() as source:
             try:
-                audio = recognizer.listen(source, timeout=10, phrase_time_limit=10)
+                audio = session_trace.capture("listen", recognizer.listen, source, timeout=10, phrase_time_limit=10)
             except sr.WaitTimeoutError:
                 continue
         try:
-            note_part = recognizer.recognize_google(audio, language="tr-TR").lower().strip()
+            note_part = session_trace.capture("stt", recognizer.recognize_google, audio, language="tr-TR").lower().strip()
             print("Alınan not bölümü:", note_part)
             if note_part == "bitti":
                 break
@@ -261,14 +290,14 @@ def voice_command():
     global lock_open, active_user, authorized_users
     recognizer = sr.Recognizer()
     try:
-        with sr.Microphone() as source:
+        with session_trace.microphone() as source:
             tts_speak("Komut bekleniyor...")
-            audio = recognizer.listen(source, timeout=10, phrase_time_limit=10)
+            audio = session_trace.capture("listen", recognizer.listen, source, timeout=10, phrase_time_limit=10)
     except sr.WaitTimeoutError:
         tts_speak("Komut alınamadı, lütfen tekrar deneyin.")
         return False
     try:
-        command = recognizer.recognize_google(audio, language="tr-TR").lower().strip()
+        command = session_trace.capture("stt", recognizer.recognize_google, audio, language="tr-TR").lower().strip()
         print(f"Tanınan komut: {command}")
     except sr.UnknownValueError:
         tts_speak("Anlayamadım, lütfen tekrar edin.")
@@ -280,7 +309,8 @@ def voice_command():
     if lock_open and active_user is not None:
         if command == "sistem kapat":
             tts_speak("Sistem kapatılıyor.")
-            time.sleep(2)
+            if not session_trace.replaying:
+                time.sleep(2)
             sys.exit()
             return True
         elif command == "tarih":
@@ -300,7 +330,8 @@ def voice_command():
             query = command.replace("ara", "").strip()
             if query:
                 tts_speak(f"{query} için Google'da arama yapılıyor.")
-                webbrowser.open(f"https://www.google.com/search?q={query.replace(' ', '+')}")
+                if not session_trace.replaying:
+                    webbrowser.open(f"https://www.google.com/search?q={query.replace(' ', '+')}")
                 return True
             else:
                 tts_speak("Aranacak ifade bulunamadı.")
@@ -322,10 +353,10 @@ def voice_command():
 tts_speak("Kilit sistemi etkinleştirildi. Lütfen doğrulama adımlarını takip edin.")
 
 while not lock_open:
-    if two_step_authentication():
+    if session_trace.timed("two_step_authentication", two_step_authentication):
         break
     else:
         tts_speak("Doğrulama başarısız. Lütfen tekrar deneyin.")
 
 while True:
-    voice_command()
+    session_trace.timed("voice_command", voice_command)
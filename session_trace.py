@@ -0,0 +1,210 @@
+import atexit
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import time
+import wave
+import zipfile
+from pathlib import Path
+from tempfile import mkdtemp
+
+import serial
+import speech_recognition as sr
+
+# ---------------- Session Trace (Record / Replay) ----------------
+# Shared by the EN and TR prototypes. Recording captures every input of a live session
+# (audio segments, serial lines, STT transcripts and timestamps); replay feeds them back
+# at full speed without microphone, Deneyap board, TTS or network access.
+#
+# While recording, the trace is an append-only directory "<record_path>.partial" holding
+# one WAV per audio segment and an events.jsonl that is flushed and fsynced per line.
+# close() packs it into the zip at record_path. If the process dies before that, the
+# directory itself is a valid trace and can be replayed as is.
+
+DEFAULT_MESSAGES = {
+    "both_set": "PHOENIX_TRACE_RECORD and PHOENIX_TRACE_REPLAY cannot be set at the same time.",
+    "recording": "Recording session trace to {path}.",
+    "replaying": "Replaying session trace {path} ({count} events).",
+    "saved": "Session trace saved to {path} ({count} events).",
+    "exhausted": "Replay finished: trace exhausted.",
+    "diverged": "Replay diverged at event {position}: expected {expected}, found {found}.",
+    "timing": "{label}: {count} calls, total {total:.3f}s, mean {mean:.3f}s, max {max:.3f}s",
+}
+
+EVENTS_FILE = "events.jsonl"
+
+
+class TraceExhausted(SystemExit):
+    """Raised when a replay runs out of events; ends the session like sys.exit(0)."""
+
+
+class SessionTrace:
+    # Exceptions that are re-raised during replay so the same code paths are taken.
+    ERROR_TYPES = {
+        "WaitTimeoutError": sr.WaitTimeoutError,
+        "UnknownValueError": sr.UnknownValueError,
+        "RequestError": sr.RequestError,
+        "SerialException": serial.SerialException,
+    }
+
+    def __init__(self, record_path=None, replay_path=None, messages=None):
+        self.messages = {**DEFAULT_MESSAGES, **(messages or {})}
+        if record_path and replay_path:
+            sys.exit(self.messages["both_set"])
+        self.record_path = record_path
+        self.replaying = bool(replay_path)
+        self.events = []
+        self.event_count = 0
+        self.position = 0
+        self.timings = {}
+        self.archive = None
+        self.trace_dir = None
+        self.events_file = None
+        self.workspace = None
+        self.closed = False
+        self.start = time.perf_counter()
+        if replay_path:
+            if Path(replay_path).is_dir():
+                self.trace_dir = Path(replay_path)
+            else:
+                self.archive = zipfile.ZipFile(replay_path, "r")
+            self.events = self._load_events(self._read(EVENTS_FILE))
+            self.workspace = Path(mkdtemp(prefix="phoenix_replay_"))
+            print(self.messages["replaying"].format(path=replay_path, count=len(self.events)))
+        elif record_path:
+            self.trace_dir = Path(f"{record_path}.partial")
+            if self.trace_dir.exists():
+                shutil.rmtree(self.trace_dir)
+            self.trace_dir.mkdir(parents=True)
+            self.events_file = open(self.trace_dir / EVENTS_FILE, "a", encoding="utf-8")
+            print(self.messages["recording"].format(path=record_path))
+        atexit.register(self.close)
+
+    @staticmethod
+    def _load_events(data):
+        events = []
+        for line in data.decode("utf-8").splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                # A line cut short by a killed recording; everything before it is intact.
+                break
+        return events
+
+    def _read(self, name):
+        if self.archive:
+            return self.archive.read(name)
+        return (self.trace_dir / name).read_bytes()
+
+    def microphone(self):
+        return contextlib.nullcontext() if self.replaying else sr.Microphone()
+
+    def local_path(self, path):
+        # During replay every file the session writes goes into a scratch workspace.
+        return self.workspace / path if self.replaying else Path(path)
+
+    def snapshot_folder(self, folder):
+        """Stores the folder's WAV files in the trace, or restores them during replay."""
+        if self.replaying:
+            local_folder = self.local_path(folder)
+            if self.archive:
+                for name in self.archive.namelist():
+                    if name.startswith(f"{folder}/"):
+                        self.archive.extract(name, self.workspace)
+            elif (self.trace_dir / folder).is_dir():
+                shutil.copytree(self.trace_dir / folder, local_folder)
+            local_folder.mkdir(parents=True, exist_ok=True)
+            return str(local_folder)
+        if self.record_path:
+            (self.trace_dir / folder).mkdir(parents=True, exist_ok=True)
+            for file in Path(folder).glob("*.wav"):
+                shutil.copyfile(file, self.trace_dir / folder / file.name)
+        return folder
+
+    def capture(self, kind, func, *args, **kwargs):
+        """Calls func live (recording its result if enabled) or returns the next traced result."""
+        if self.replaying:
+            return self._replay(kind)
+        if not self.record_path:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            value = func(*args, **kwargs)
+        except Exception as e:
+            self._record(kind, started, error=type(e).__name__, message=str(e))
+            raise
+        self._record(kind, started, value=value)
+        return value
+
+    def _record(self, kind, started, value=None, error=None, message=None):
+        index = self.event_count
+        self.event_count += 1
+        event = {
+            "kind": kind,
+            "t": round(started - self.start, 4),
+            "duration": round(time.perf_counter() - started, 4),
+        }
+        if error:
+            event["error"] = error
+            event["message"] = message
+        elif isinstance(value, sr.AudioData):
+            event["audio"] = f"audio/{index:06d}.wav"
+            audio_file = self.trace_dir / event["audio"]
+            audio_file.parent.mkdir(exist_ok=True)
+            audio_file.write_bytes(value.get_wav_data())
+        elif isinstance(value, serial.Serial):
+            # An open port cannot be replayed; only the fact that opening succeeded is kept.
+            event["value"] = None
+        else:
+            event["value"] = value
+        self.events_file.write(json.dumps(event) + "\n")
+        self.events_file.flush()
+        os.fsync(self.events_file.fileno())
+
+    def _replay(self, kind):
+        if self.position >= len(self.events):
+            print(self.messages["exhausted"])
+            raise TraceExhausted(0)
+        event = self.events[self.position]
+        self.position += 1
+        if event["kind"] != kind:
+            sys.exit(self.messages["diverged"].format(position=self.position, expected=kind, found=event["kind"]))
+        if "error" in event:
+            raise self.ERROR_TYPES.get(event["error"], RuntimeError)(event["message"])
+        if "audio" in event:
+            with wave.open(io.BytesIO(self._read(event["audio"]))) as w:
+                return sr.AudioData(w.readframes(w.getnframes()), w.getframerate(), w.getsampwidth())
+        return event["value"]
+
+    def timed(self, label, func):
+        """Runs func and keeps its duration; calls that do not return normally are not samples."""
+        started = time.perf_counter()
+        value = func()
+        self.timings.setdefault(label, []).append(time.perf_counter() - started)
+        return value
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.replaying:
+            for label, durations in self.timings.items():
+                print(self.messages["timing"].format(
+                    label=label, count=len(durations), total=sum(durations),
+                    mean=sum(durations) / len(durations), max=max(durations)))
+            shutil.rmtree(self.workspace, ignore_errors=True)
+            if self.archive:
+                self.archive.close()
+                self.archive = None
+        elif self.events_file:
+            self.events_file.close()
+            self.events_file = None
+            with zipfile.ZipFile(self.record_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                for file in sorted(self.trace_dir.rglob("*")):
+                    if file.is_file():
+                        archive.write(file, file.relative_to(self.trace_dir).as_posix())
+            shutil.rmtree(self.trace_dir)
+            print(self.messages["saved"].format(path=self.record_path, count=self.event_count))
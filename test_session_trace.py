@@ -0,0 +1,75 @@
+import pytest
+import serial
+import speech_recognition as sr
+
+from session_trace import SessionTrace, TraceExhausted
+
+
+def record_session(trace):
+    """Records one audio segment, one transcript and one serial failure."""
+    audio = trace.capture("listen", lambda: sr.AudioData(b"\x01\x02" * 800, 16000, 2))
+    text = trace.capture("stt", lambda data: "how are you", audio)
+
+    def read_serial():
+        raise serial.SerialException("could not open port COM15")
+
+    with pytest.raises(serial.SerialException):
+        trace.capture("serial", read_serial)
+    return audio, text
+
+
+def assert_replays(trace, audio, text):
+    replayed = trace.capture("listen", None)
+    assert isinstance(replayed, sr.AudioData)
+    assert (replayed.frame_data, replayed.sample_rate, replayed.sample_width) == (
+        audio.frame_data, audio.sample_rate, audio.sample_width)
+    assert trace.capture("stt", None) == text
+    with pytest.raises(serial.SerialException, match="could not open port COM15"):
+        trace.capture("serial", None)
+    with pytest.raises(TraceExhausted):
+        trace.capture("listen", None)
+
+
+def test_recorded_archive_replays_same_values_and_errors(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "references").mkdir()
+    (tmp_path / "references" / "reference_john.wav").write_bytes(b"RIFF")
+    recorder = SessionTrace(record_path="session.zip")
+    recorder.snapshot_folder("references")
+    audio, text = record_session(recorder)
+    recorder.close()
+    assert (tmp_path / "session.zip").is_file()
+    assert not (tmp_path / "session.zip.partial").exists()
+
+    replayer = SessionTrace(replay_path="session.zip")
+    references = replayer.snapshot_folder("references")
+    assert (tmp_path / references / "reference_john.wav").read_bytes() == b"RIFF"
+    assert_replays(replayer, audio, text)
+    replayer.close()
+
+
+def test_unclosed_recording_replays_from_partial_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    recorder = SessionTrace(record_path="session.zip")
+    audio, text = record_session(recorder)
+    # Simulate a killed process: no close(), and a line cut short mid-write.
+    with open(tmp_path / "session.zip.partial" / "events.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"kind": "li')
+
+    replayer = SessionTrace(replay_path="session.zip.partial")
+    assert_replays(replayer, audio, text)
+    replayer.close()
+    recorder.close()
+
+
+def test_timed_keeps_only_calls_that_return(tmp_path):
+    trace = SessionTrace()
+    assert trace.timed("voice_command", lambda: True) is True
+
+    def crash():
+        raise RuntimeError("unknown recorded error")
+
+    for func in (crash, lambda: trace._replay("listen")):
+        with pytest.raises((RuntimeError, TraceExhausted)):
+            trace.timed("voice_command", func)
+    assert len(trace.timings["voice_command"]) == 1